@@ -0,0 +1,81 @@
+# Import-time budget check for the GUI and the generation worker.
+#
+# Each module is imported in a fresh interpreter with `python -X importtime`, from the gui
+# directory like the GUI does (generation_worker finds the backend through ../python).
+# The slowest imports are listed, and the script exits with 1 when a module goes over
+# its budget, so it can be run by hand or from CI:
+#
+#   python bench/import_time.py                 # default budgets
+#   python bench/import_time.py 0.5 3.0         # worker budget, GUI budget (seconds)
+import os
+import re
+import subprocess
+import sys
+
+GUI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "gui")
+
+# (module, budget in seconds): the worker has to be computing in under 0.5 s
+BUDGETS = [
+    ("generation_worker", 0.5),
+    ("top6meta", 3.0),
+]
+TOP = 10
+
+# "import time: <self us> | <cumulative us> | <indent><module>"
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(module):
+    # returns (total seconds, [(cumulative seconds, name)] of the imports done by the module);
+    # the total includes the interpreter start-up imports (site, encodings), the worker pays them too
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                             cwd=GUI_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                             universal_newlines=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{process.stderr.splitlines()[-1]}")
+
+    # a module is printed after its own imports, indented by one more level (2 spaces);
+    # top-level imports have an indent of one space
+    total = 0.0
+    imports = []
+    pending = []
+    for line in process.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        seconds = int(match.group(2)) / 1e6
+        indent = len(match.group(3))
+        if indent == 1:
+            total += seconds
+            if match.group(4) == module:
+                imports = pending
+            pending = []
+        elif indent == 3:
+            pending.append((seconds, match.group(4)))
+    return total, imports
+
+
+def main():
+    budgets = BUDGETS
+    if len(sys.argv) > 1:
+        budgets = [(module, float(budget)) for (module, _), budget in zip(BUDGETS, sys.argv[1:])]
+
+    failed = False
+    for module, budget in budgets:
+        try:
+            total, imports = measure(module)
+        except RuntimeError as e:
+            print(e)
+            failed = True
+            continue
+
+        status = "ok" if total <= budget else "OVER BUDGET"
+        print(f"{module}: {total:.3f} s (budget {budget:.1f} s) {status}")
+        for seconds, name in sorted(imports, reverse=True)[:TOP]:
+            print(f"    {seconds:8.3f} s  {name}")
+        failed = failed or total > budget
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
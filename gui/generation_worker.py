@@ -22,37 +22,251 @@
 # =============================================================================
 import sys
 import os
+import re
+import json
+import time
+import queue
+import signal
 import pickle
+import threading
 import traceback
+import _thread
+import numpy as np
 
 # parent directory to path to import tpms_core
 sys.path.append('../python')
 import tpms_core
 
+# set by the command reader of the --serve mode when the GUI cancels the running job
+cancel_event = threading.Event()
+job_active = False
+
+class GenerationCancelled(BaseException):
+    # BaseException (like KeyboardInterrupt) so that "except Exception" blocks in the
+    # generators do not swallow it
+    pass
+
 def stop_callback():
-    # This callback can later be used to check if a user wants to stop the generation
-    # process earlier
-    return False
+    # Passed to generate_tpms, which accepts it but does not call it yet; the cancel
+    # itself works through the SIGINT raised by _interrupt_main
+    return cancel_event.is_set()
 
-def main():
-    if len(sys.argv) != 3:
-        print("Usage: python generation_worker.py <params_file> <temp_dir>", file=sys.stderr)
-        sys.exit(1)
+def _interrupt_main():
+    # A real SIGINT sent to the main thread also wakes it from lock waits such as
+    # future.result() on the process pool; _thread.interrupt_main() only sets the flag and
+    # is checked once that wait is over. pthread_kill is not available on Windows.
+    if hasattr(signal, "pthread_kill"):
+        signal.pthread_kill(threading.main_thread().ident, signal.SIGINT)
+    else:
+        _thread.interrupt_main()
+
+def _on_interrupt(signum, frame):
+    # Runs in the main thread between two bytecodes of whatever the backend is executing
+    # (calibration iterations, strut layers, ...), which is what makes the cancel cooperative.
+    # Outside a job the interrupt is ignored, so a late cancel cannot hit the serve loop.
+    if job_active and cancel_event.is_set():
+        raise GenerationCancelled()
+
+def reclaim_process_pool():
+    # Terminate the pool workers still busy with a cancelled job instead of waiting for
+    # them; tpms_core creates a fresh pool on its next get_process_pool() call.
+    pool = getattr(tpms_core, "_process_pool", None)
+    if pool is None:
+        return
+    processes = list((pool._processes or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+    tpms_core._process_pool = None
+
+class ProgressReporter:
+    # File-like replacement for sys.stdout during a job of the --serve mode. Everything is
+    # passed on to stderr unchanged, and the lines the generators print are mapped to a
+    # stage and sent to the GUI as JSON lines:
+    #   {"event": "progress", "temp_dir", "stage", "step", "iteration", "vf", "elapsed", "eta", "message"}
+    # Every calibration iteration meshes and measures the part, so from "Before RDensity"
+    # (or the first iteration) up to "After RDensity/FDensity" the stage stays "calibration"
+    # and the isosurface/isocaps/measurement lines only set its "step".
+    # The ETA is the duration of the previous job with the same option and MDP: it does not
+    # account for a different VF, repetitions or Archi.
     
-    params_file = sys.argv[1]
-    temp_dir = sys.argv[2]
+    # (start of the printed line, stage), first match wins
+    STAGES = [
+        ("Checking input parameters", "validation"),
+        ("Input parameters have been validated", "setup"),
+        ("Creating Architecture", "field"),
+        ("Before RDensity", "calibration"),
+        ("RDensity: iter", "calibration"),
+        ("FDensity: iter", "calibration"),
+        ("Early stopping", "calibration"),
+        ("replicationList=", "strut lattice"),
+        ("i=", "strut lattice"),
+        ("inside get_fv", "isosurface"),
+        ("calling isosurface", "isosurface"),
+        ("calling isocaps", "isocaps"),
+        ("measure.mesh_surface_area", "measurement"),
+        ("stlVolume", "measurement"),
+        ("get_volume_fraction", "measurement"),
+        ("Creating STL file", "export"),
+    ]
+    CALIBRATION_END = ("After RDensity", "After FDensity")
+    CALIBRATION_LINE = re.compile(r"[RF]Density: iter (\d+), tStart = (\S+), Vol_frac = ([-+.\deE]+)")
+    ITERATION_LINE = re.compile(r"i=(\d+)")
+    MIN_INTERVAL = 0.1  # seconds between two events of the same stage
     
-    try:
-        try:
-            import os
-            os.nice(-5)  # Higher priority on Unix systems
-        except:
-            pass
+    def __init__(self, channel, stream):
+        self.channel = channel
+        self.stream = stream
+        self.durations = {}     # (option, MDP) -> seconds of the last successful job
+        self.temp_dir = None
+        # process pool children forked during a job inherit sys.stdout, and with it a stale
+        # copy of this reporter: only the worker itself reports progress
+        self.pid = os.getpid()
+    
+    def start(self, option, params, temp_dir):
+        self.key = (option, params.get('MDP'))
+        self.temp_dir = temp_dir
+        self.buffer = ""
+        self.start_time = time.monotonic()
+        self.stage = "starting"
+        self.stage_start = self.start_time
+        self.step = None
+        self.step_start = self.start_time
+        self.last_event = 0.0
+        self.timings = {}
+    
+    def finish(self, ok):
+        # close the last stage and return the per-stage timings in seconds
+        now = time.monotonic()
+        self._close_stage(now)
+        self.timings["total"] = now - self.start_time
+        if ok:
+            self.durations[self.key] = self.timings["total"]
+        self.temp_dir = None
+        return self.timings
+    
+    def write(self, text):
+        self.stream.write(text)
+        if self.temp_dir is None or os.getpid() != self.pid:
+            return len(text)
+        self.buffer += text
+        while "\n" in self.buffer:
+            line, self.buffer = self.buffer.split("\n", 1)
+            self._parse(line.strip())
+        return len(text)
+    
+    def flush(self):
+        self.stream.flush()
+    
+    def __getattr__(self, name):
+        # fileno(), isatty(), encoding, ... of the underlying stream
+        return getattr(self.stream, name)
+    
+    def _close_stage(self, now):
+        self._close_step(now)
+        self.timings[self.stage] = self.timings.get(self.stage, 0.0) + now - self.stage_start
+    
+    def _close_step(self, now):
+        # sub-step timings are reported as "<stage>: <step>", and are part of the stage time
+        if self.step is not None:
+            key = f"{self.stage}: {self.step}"
+            self.timings[key] = self.timings.get(key, 0.0) + now - self.step_start
+    
+    def _parse(self, line):
+        stage = next((name for prefix, name in self.STAGES if line.startswith(prefix)), None)
+        step = None
+        if self.stage == "calibration":
+            if line.startswith(self.CALIBRATION_END):
+                # the calibrated field is built next
+                stage = "field"
+            elif stage is not None and stage != "calibration":
+                step, stage = stage, "calibration"
+        if stage is None:
+            return
+        
+        now = time.monotonic()
+        if stage != self.stage:
+            self._close_stage(now)
+            self.stage = stage
+            self.stage_start = now
+            self.step = step
+            self.step_start = now
+        elif step != self.step:
+            self._close_step(now)
+            self.step = step
+            self.step_start = now
+        elif now - self.last_event < self.MIN_INTERVAL and not self.CALIBRATION_LINE.match(line):
+            # calibration iterations are always reported, they are seconds apart
+            return
+        self.last_event = now
+        
+        iteration = vf = None
+        match = self.CALIBRATION_LINE.match(line) or self.ITERATION_LINE.match(line)
+        if match:
+            iteration = int(match.group(1))
+            if match.lastindex == 3:
+                vf = float(match.group(3))
         
+        elapsed = now - self.start_time
+        eta = None
+        if self.key in self.durations:
+            eta = max(self.durations[self.key] - elapsed, 0.0)
+        
+        self.channel.write(json.dumps({
+            "event": "progress", "temp_dir": self.temp_dir, "stage": stage, "step": step,
+            "iteration": iteration, "vf": vf, "elapsed": elapsed, "eta": eta, "message": line
+        }) + "\n")
+
+def save_result(result, temp_dir):
+    # Meshes are written as .npy files in the offsets/connectivity layout of vtkCellArray,
+    # so the GUI can memory-map them and VTK can use the buffers without any copy:
+    #   <F key>_offsets.npy      : int64 (n + 1,), start of each triangle in the connectivity
+    #   <F key>_connectivity.npy : int64 (3 n,), point ids of the triangles
+    #   <V key>.npy              : float (m, 3), points as returned by the backend
+    # Everything else (volume fraction, surface, ...) and the list of mesh keys go to
+    # result.pkl, which is written last and marks the result as complete.
+    meshes = []
+    scalars = {}
+    for key, value in result.items():
+        vkey = "V" + key[1:]
+        if key.startswith("F") and vkey in result:
+            connectivity = np.ascontiguousarray(value, dtype=np.int64).reshape(-1)
+            offsets = np.arange(0, connectivity.size + 1, 3, dtype=np.int64)
+            np.save(os.path.join(temp_dir, key + "_offsets.npy"), offsets)
+            np.save(os.path.join(temp_dir, key + "_connectivity.npy"), connectivity)
+            np.save(os.path.join(temp_dir, vkey + ".npy"), np.ascontiguousarray(result[vkey]))
+            meshes.append((key, vkey))
+        elif not (key.startswith("V") and "F" + key[1:] in result):
+            scalars[key] = value
+    
+    scalars["meshes"] = meshes
+    result_file = os.path.join(temp_dir, "result.pkl")
+    with open(result_file + ".tmp", 'wb') as f:
+        pickle.dump(scalars, f)
+    os.replace(result_file + ".tmp", result_file)
+
+def run_job(params_file, temp_dir, reporter=None):
+    # Run a single generation job. The result is written to <temp_dir> (see save_result),
+    # or the error to <temp_dir>/error.txt. Returns True on success.
+    option = None
+    try:
         # load parameters
         with open(params_file, 'rb') as f:
             option, params = pickle.load(f)
         
+        if reporter is not None:
+            reporter.start(option, params, temp_dir)
+        
+        # The spinodal waves are drawn from numpy's global generator, so seeding it here makes
+        # the generation reproducible: same seed and inputs, same field. The generators do
+        # not take a seed argument themselves. Without a seed the generator is reseeded from
+        # the OS, the --serve worker would otherwise continue the stream of an earlier job.
+        seed = params.pop('seed', None)
+        if seed is not None:
+            np.random.seed(seed)
+        else:
+            np.random.seed()
+        
         print(f"Starting {option} generation...", file=sys.stderr)
         
         # run the computation based on option
@@ -82,7 +296,9 @@ def main():
             
         elif option == "Spinodal":
             if params.get('IPC') == "IPC_Y":
-                Freinf, Vreinf, Fcompl, Vcompl, Final_Vol_Frac, Final_Surface = tpms_core.generate_tpms(**params)
+                Freinf, Vreinf, Fcompl, Vcompl, Final_Vol_Frac, Final_Surface = tpms_core.generate_tpms(
+                    **params, stop_callback=stop_callback
+                )
                 result = {
                     "F_reinf": Freinf,
                     "V_reinf": Vreinf,
@@ -92,7 +308,9 @@ def main():
                     "Final_Surface": Final_Surface
                 }
             else:
-                F, V, Final_Vol_Frac, Final_Surface = tpms_core.generate_tpms(**params)
+                F, V, Final_Vol_Frac, Final_Surface = tpms_core.generate_tpms(
+                    **params, stop_callback=stop_callback
+                )
                 result = {
                     "F": F,
                     "V": V,
@@ -155,11 +373,10 @@ def main():
             raise ValueError(f"Invalid option for generation: {option}")
         
         # Save result
-        result_file = os.path.join(temp_dir, "result.pkl")
-        with open(result_file, 'wb') as f:
-            pickle.dump(result, f)
+        save_result(result, temp_dir)
         
         print(f"{option} generation completed successfully!", file=sys.stderr)
+        return True
         
     except Exception as e:
         # Save error
@@ -169,7 +386,7 @@ def main():
             f.write(traceback.format_exc())
         
         print(f"Error in {option} generation: {str(e)}", file=sys.stderr)
-        sys.exit(1)
+        return False
     
     finally:
         # clean up params file
@@ -178,5 +395,99 @@ def main():
         except:
             pass
 
+def _read_commands(commands, jobs):
+    # Reader thread of the --serve mode. Jobs are queued for the main thread, a cancel
+    # is applied immediately by interrupting the main thread.
+    for line in commands:
+        line = line.decode(errors="replace").strip()
+        if not line:
+            continue
+        try:
+            command = json.loads(line)
+        except ValueError:
+            print(f"Ignoring malformed command: {line}", file=sys.stderr)
+            continue
+        if command.get("command") == "cancel":
+            cancel_event.set()
+            _interrupt_main()
+        else:
+            jobs.put(command)
+    # stdin closed: the GUI is gone
+    jobs.put({"command": "shutdown"})
+
+def serve():
+    # Long-lived worker: keeps numpy/scipy/skimage/pyvista and tpms_core imported between
+    # generations (the process pool is not kept, generate_tpms and generate_hybrid call
+    # cleanup_process_pool() before returning). Jobs arrive as JSON lines on stdin
+    # ({"params_file": ..., "temp_dir": ...}) and each one is answered with a JSON
+    # line ({"event": "done" | "cancelled", "temp_dir": ..., "ok": ..., "timings": ...}) on
+    # the original stdout, preceded by progress events (see ProgressReporter).
+    # {"command": "cancel"} stops the running job and keeps the worker alive.
+    # The backend prints progress with print(), so stdout is redirected to stderr
+    # and the protocol uses a private duplicate of the original stdout descriptor.
+    global job_active
+    sys.stdout.flush()
+    channel = os.fdopen(os.dup(sys.stdout.fileno()), 'w', buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    reporter = ProgressReporter(channel, sys.stderr)
+    sys.stdout = reporter
+    
+    # Commands are read from an unbuffered duplicate of stdin, and sys.stdin itself points to
+    # devnull: a reader thread blocked on sys.stdin holds its buffer lock, and every process
+    # pool child forked meanwhile deadlocks in multiprocessing's _close_stdin.
+    commands = os.fdopen(os.dup(sys.stdin.fileno()), 'rb', buffering=0)
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, sys.stdin.fileno())
+    os.close(devnull)
+    sys.stdin = open(os.devnull)
+    
+    signal.signal(signal.SIGINT, _on_interrupt)
+    jobs = queue.Queue()
+    reader = threading.Thread(target=_read_commands, args=(commands, jobs), daemon=True)
+    reader.start()
+    
+    channel.write(json.dumps({"event": "ready", "pid": os.getpid()}) + "\n")
+    
+    while True:
+        job = jobs.get()
+        if job.get("command") == "shutdown":
+            break
+        
+        cancel_event.clear()
+        try:
+            job_active = True
+            ok = run_job(job["params_file"], job["temp_dir"], reporter)
+            job_active = False
+            event = "done"
+        except GenerationCancelled:
+            job_active = False
+            print("Generation cancelled.", file=sys.stderr)
+            reclaim_process_pool()
+            ok = False
+            event = "cancelled"
+        timings = reporter.finish(ok) if reporter.temp_dir is not None else {}
+        channel.write(json.dumps({"event": event, "temp_dir": job["temp_dir"], "ok": ok, "timings": timings}) + "\n")
+    
+    # release the process pool in case a generator left one behind
+    tpms_core.cleanup_process_pool()
+
+def main():
+    try:
+        os.nice(-5)  # Higher priority on Unix systems
+    except:
+        pass
+    
+    if len(sys.argv) == 2 and sys.argv[1] == "--serve":
+        serve()
+        return
+    
+    if len(sys.argv) != 3:
+        print("Usage: python generation_worker.py <params_file> <temp_dir>", file=sys.stderr)
+        print("       python generation_worker.py --serve", file=sys.stderr)
+        sys.exit(1)
+    
+    if not run_job(sys.argv[1], sys.argv[2]):
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -30,18 +30,16 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QLineEdit, QGridLayout, QCheckBox, QSlider,
                              QMessageBox, QDialog, QGroupBox, QFileDialog,
                              QProgressDialog, QFrame, QColorDialog, QDialogButtonBox,
-                             QTableWidget, QTableWidgetItem, QHeaderView, QAction, QSplitter)
+                             QTableWidget, QTableWidgetItem, QHeaderView, QAction, QSplitter,
+                             QProgressBar)
 from PyQt5.QtGui import QFont, QPalette, QColor, QRegExpValidator, QDoubleValidator, QIntValidator
 from PyQt5.QtCore import Qt, QRegExp, QTimer, QThread, pyqtSignal, QObject
 
+# the backend (tpms_core and its dependencies) only runs in generation_worker.py, so the GUI
+# does not import it; tpms_moments and OCC are imported on first use (see get_moments, save_cardfile)
 sys.path.append('../python')
-import tpms_core            # import tpms_core.py
-import tpms_moments         # import tpms_moments.py
 np.bool = np.bool_          # fix the bool type error (conda env problems)
 
-from OCC.Core.STEPControl import STEPControl_Writer, STEPControl_AsIs
-from OCC.Core.StlAPI import StlAPI_Reader
-from OCC.Core.TopoDS import TopoDS_Shape
 import os
 import csv
 
@@ -49,6 +47,9 @@ import subprocess
 import pickle
 import tempfile
 import webbrowser
+import json
+import signal
+import threading
 
 # global variables for the TPMS interface 
 # All the variables get default vales for each type using the function "update_configuration" in the TPMSInterface class
@@ -64,6 +65,7 @@ y_rep_for_hybrid = []                                       # Hybrid has 1 repet
 z_repo_for_hybrid = []                                      # Hybrid has 1 repetition for each layer
 vol_fraction_for_hybrid = []                                # Hybrid has 1 volume fraction for each layer
 waves_number = 1000                                         # for spinodal  (waves range: 100-10000) - (dont have decimal)
+spinodal_seed = ""                                          # for spinodal  (empty: new random waves on every run, else reproducible)
 number_of_layers = 2                                        # for hybrid and layered (hybrid 2 or 3, layered 2..9)
 transition_quality = 5                                     # for hybrid (transition quality range: 1-40 - translate to "Low", "Medium", "High")
 transition_location = "0.5"                                 # for hybrid - is a value between 0.2-0.8 with default value 0.5
@@ -117,6 +119,11 @@ model_color = (0.5059, 0.9686, 0.5490)
 run_parallel = True
 model_ipc_structure = False                                 # global variable for the Model IPC Structure checkbox
 
+def get_moments(F, V):
+    # tpms_moments pulls in matplotlib, trimesh and numpy-stl, so it is imported on first use
+    import tpms_moments         # import tpms_moments.py
+    return tpms_moments.get_moments(F, V)
+
 class TPMSInterface(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -1050,7 +1057,7 @@ class TPMSInterface(QMainWindow):
         global length, height, width, radius, bottom_face_thickness, top_face_thickness, left_support_thick, right_support_thick
         global resolution_points, bending_radius, stretching_radius, vertical_radius, joint_radius, x_repetitions, y_repetitions, z_repetitions
         global x_stretching, y_stretching, z_stretching, x_rotation, y_rotation, z_rotation, transition_location, transition_quality
-        global waves_number, number_of_layers
+        global waves_number, number_of_layers, spinodal_seed
         global volume_fraction_strut, min_volume_fraction_strut, max_volume_fraction_strut
         global min_bending_radius, min_stretching_radius, min_vertical_radius, min_joint_radius
         global max_bending_radius, max_stretching_radius, max_vertical_radius, max_joint_radius
@@ -1096,6 +1103,7 @@ class TPMSInterface(QMainWindow):
             left_support_thick = 10
             right_support_thick = 10
             bottom_face_thickness = 4
+            spinodal_seed = ""
             
             if not waves_number:
                 self.popup_empty_values()
@@ -2058,20 +2066,204 @@ class MomentsDialog(QDialog):
             print(f"Data saved to {file_path}")
             QMessageBox.information(self, "Data Saved", f"Data saved to {file_path}")
 
+class WorkerDaemon:
+    # Long-lived "generation_worker.py --serve" process shared by every GenerationProcess.
+    # It keeps numpy/scipy/skimage/pyvista and tpms_core imported between generations, so
+    # only the first run pays the import cost (the tpms_core process pool is still rebuilt
+    # by every generate_tpms/generate_hybrid call, which clean it up before returning). Jobs are sent as
+    # JSON lines on its stdin, replies are read from its stdout by a background thread and
+    # handed to the listener of the job they belong to (by temp dir).
+    # The worker runs in its own session (process group) on POSIX, shared by the process pool
+    # children it forks, so that a stop terminates them too: orphaned children would keep
+    # computing and hold the worker's stdout open.
+    
+    _instance = None
+    
+    # how long a cancelled job may take to reach a checkpoint (a long native call such as
+    # marching cubes cannot be interrupted) before the worker is terminated instead
+    CANCEL_TIMEOUT = 3.0
+    
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+    
+    def __init__(self):
+        self.process = None
+        self.listeners = {}         # temp dir -> (worker process, callable) of the jobs not answered yet
+        self.lock = threading.Lock()
+        self.cancelling = None      # temp dir of the job being cancelled
+        
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+    
+    def ensure_started(self):
+        # start the worker if it is not running (first use, after a stop or after a crash)
+        if self.is_alive():
+            return
+        
+        script_path = os.path.join(os.path.dirname(__file__), "generation_worker.py")
+        self.process = subprocess.Popen([
+            sys.executable, script_path, "--serve"
+        ], stdin=subprocess.PIPE, stdout=subprocess.PIPE, universal_newlines=True, bufsize=1,
+            start_new_session=(os.name == 'posix'))
+        
+        reader = threading.Thread(target=self._read_messages, args=(self.process,), daemon=True)
+        reader.start()
+        watcher = threading.Thread(target=self._watch, args=(self.process,), daemon=True)
+        watcher.start()
+    
+    def _read_messages(self, process):
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            with self.lock:
+                listener = self.listeners.get(message.get("temp_dir"), (None, None))[1]
+                if message.get("event") in ("done", "cancelled"):
+                    self.listeners.pop(message.get("temp_dir"), None)
+            if listener is not None:
+                listener(message)
+        # stdout closed: the worker has exited (normally or not)
+        self._worker_exited(process)
+    
+    def _watch(self, process):
+        # The end of stdout is not enough to notice that the worker died: process pool children
+        # that outlive it keep stdout open. They are killed with it.
+        process.wait()
+        self._kill_tree(process)
+        self._worker_exited(process)
+    
+    def _worker_exited(self, process):
+        # tell the jobs the worker still had that it is gone (once, from the reader or the watcher)
+        with self.lock:
+            waiting = [temp_dir for temp_dir, (owner, _) in self.listeners.items() if owner is process]
+            listeners = [self.listeners.pop(temp_dir)[1] for temp_dir in waiting]
+        for listener in listeners:
+            listener({"event": "exit"})
+    
+    def submit(self, params_file, temp_dir, listener):
+        # listener is called from the reader thread with every message about this job, the
+        # last one being "done", "cancelled" or "exit" (the worker is gone)
+        
+        # a job still being cancelled would hold up this one, restart the worker instead
+        if self._cancel_pending():
+            print("Previous generation is still stopping, restarting the worker...")
+            self.stop()
+        self.ensure_started()
+        with self.lock:
+            self.listeners[temp_dir] = (self.process, listener)
+        try:
+            self.process.stdin.write(json.dumps({"params_file": params_file, "temp_dir": temp_dir}) + "\n")
+            self.process.stdin.flush()
+        except (OSError, ValueError):
+            with self.lock:
+                self.listeners.pop(temp_dir, None)
+            raise
+    
+    def cancel(self, temp_dir):
+        # Cooperative cancel of the running job, the worker itself stays alive. The escalation
+        # belongs to the daemon, not to the GenerationProcess (which may already be gone when
+        # its window was closed): after CANCEL_TIMEOUT a worker that has not answered is
+        # terminated, and the temporary directory of the job is removed.
+        # Returns False if there is no worker to cancel the job in.
+        if not self.is_alive():
+            return False
+        self.process.stdin.write(json.dumps({"command": "cancel"}) + "\n")
+        self.process.stdin.flush()
+        self.cancelling = temp_dir
+        QTimer.singleShot(int(self.CANCEL_TIMEOUT * 1000), lambda: self._finish_cancel(temp_dir))
+        return True
+    
+    def _cancel_pending(self):
+        return self.cancelling is not None and self.cancelling in self.listeners and self.is_alive()
+    
+    def _finish_cancel(self, temp_dir):
+        if self.cancelling == temp_dir:
+            if self._cancel_pending():
+                print("Generation did not stop in time, terminating the worker...")
+                self.stop()
+            self.cancelling = None
+        
+        if os.path.exists(temp_dir):
+            import shutil
+            try:
+                shutil.rmtree(temp_dir)
+            except OSError as e:
+                print(f"Could not remove temporary directory {temp_dir}: {e}")
+    
+    def stop(self):
+        # hard stop of the worker and its process pool children, used to cancel a running job;
+        # the worker is restarted on the next submit
+        if self.process is not None:
+            self._kill_tree(self.process)
+        self.process = None
+    
+    @staticmethod
+    def _kill_tree(process):
+        if os.name == 'posix':
+            # the session of the worker: terminate it, then kill whatever is left of it
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+            except OSError:
+                return
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                pass
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        elif process.poll() is None:
+            # the children can only be found through their parent while it is alive
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            process.wait()
+    
+    def shutdown(self):
+        # graceful stop, used when the application exits; a running job is not waited for
+        if self.listeners:
+            self.stop()
+        if self.is_alive():
+            try:
+                self.process.stdin.write(json.dumps({"command": "shutdown"}) + "\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=5)
+            except (OSError, ValueError, subprocess.TimeoutExpired):
+                self.stop()
+        self.process = None
+
+class MeshFaces(np.ndarray):
+    # (n, 3) triangles of a generation result: a view of the vtkCellArray connectivity written
+    # by the worker, with the matching offsets. Arrays derived from it (slices, arithmetic)
+    # do not get the offsets and are converted by create_pyvista_mesh like any other F.
+    offsets = None
+
 class GenerationProcess(QObject):
     #Drop-in replacement for GenerationThread using subprocess instead of threading.
+    #Jobs run in the shared WorkerDaemon; a fresh one-shot subprocess is used only if
+    #the daemon cannot be reached or crashes during the job.
     
     finished = pyqtSignal(object)  # emit a tuple or dict with results (F,V ...)
     error = pyqtSignal(str)
     stopped = pyqtSignal()
+    progress = pyqtSignal(dict)    # progress events of the worker, and the final per-stage timings
+    message = pyqtSignal(dict)     # messages of the worker about this job, emitted by its reader thread
     
     def __init__(self, option, params):
         super().__init__()
         self.option = option
         self.params = params
         self.process = None
+        self.daemon = None
         self.stop_requested = False
         self.temp_dir = None
+        # the worker's messages are streamed to the GUI thread as they arrive, the timer only
+        # polls a one-shot subprocess
+        self.message.connect(self._on_message, Qt.QueuedConnection)
         self.check_timer = QTimer()
         self.check_timer.timeout.connect(self._check_process)
         
@@ -2080,13 +2272,26 @@ class GenerationProcess(QObject):
         
         # Create temporary directory for communication
         self.temp_dir = tempfile.mkdtemp(prefix="generation_")
+        params_file = self._write_params()
         
+        try:
+            daemon = WorkerDaemon.instance()
+            daemon.submit(params_file, self.temp_dir, self.message.emit)
+            self.daemon = daemon
+        except (OSError, ValueError) as e:
+            print(f"Generation worker unavailable ({e}), using a fresh subprocess...")
+            self._start_subprocess(params_file)
+    
+    def _write_params(self):
         # Serialize parameters
         params_file = os.path.join(self.temp_dir, "params.pkl")
         with open(params_file, 'wb') as f:
             pickle.dump((self.option, self.params), f)
-        
-        # Start subprocess
+        return params_file
+    
+    def _start_subprocess(self, params_file):
+        # Start a one-shot subprocess
+        self.daemon = None
         script_path = os.path.join(os.path.dirname(__file__), "generation_worker.py")
         self.process = subprocess.Popen([
             sys.executable, script_path, 
@@ -2100,6 +2305,15 @@ class GenerationProcess(QObject):
     def stop(self):
         print("Stopping generation process...")
         self.stop_requested = True
+        if self.daemon is not None:
+            # ask the worker to cancel and return at once, _on_message emits "stopped"
+            # when the worker confirms, or exits after WorkerDaemon.CANCEL_TIMEOUT
+            try:
+                if self.daemon.cancel(self.temp_dir):
+                    return
+            except (OSError, ValueError):
+                pass
+            self.daemon.stop()
         if self.process and self.process.poll() is None:
             self.process.terminate()
             # Force kill if it doesn't terminate nicely
@@ -2107,62 +2321,105 @@ class GenerationProcess(QObject):
                 self.process.wait(timeout=5)
             except subprocess.TimeoutExpired:
                 self.process.kill()
+        self.check_timer.stop()
+        self.stopped.emit()
         self._cleanup()
         
+    def _on_message(self, message):
+        # a message of the worker about this job, in the GUI thread; messages arriving after
+        # the job was handled (stopped, or moved to a fresh subprocess) are ignored
+        if self.daemon is None:
+            return
+        if message.get("event") == "progress":
+            self.progress.emit(message)
+        elif message.get("event") in ("done", "cancelled"):
+            self.progress.emit(message)
+            self._emit_results()
+        elif message.get("event") == "exit" and self.stop_requested:
+            self._emit_results()
+        elif message.get("event") == "exit":
+            # the worker crashed during the job, run it again in a fresh subprocess
+            print("Generation worker exited unexpectedly, retrying in a fresh subprocess...")
+            self._start_subprocess(self._write_params())
+    
     def _check_process(self):
-        # Check if process has finished and handle results
+        # Check if the one-shot subprocess has finished and handle results
         if self.process is None:
             return
             
         if self.process.poll() is not None:  # Process has finished
             self.check_timer.stop()
-            
-            if self.stop_requested:
-                self.stopped.emit()
-                self._cleanup()
-                return
-            
-            # check for results
-            result_file = os.path.join(self.temp_dir, "result.pkl")
-            error_file = os.path.join(self.temp_dir, "error.txt")
-            
-            if os.path.exists(result_file):
-                try:
-                    with open(result_file, 'rb') as f:
-                        result = pickle.load(f)
-                    self.finished.emit(result)
-                except Exception as e:
-                    self.error.emit(f"Failed to load result: {str(e)}")
-            elif os.path.exists(error_file):
-                try:
-                    with open(error_file, 'r') as f:
-                        error_msg = f.read()
-                    self.error.emit(error_msg)
-                except Exception as e:
-                    self.error.emit(f"Process failed: {str(e)}")
-            else:
-                # check subprocess stderr
-                stderr = self.process.stderr.read().decode() if self.process.stderr else ""
-                if stderr:
-                    self.error.emit(f"Process error: {stderr}")
-                else:
-                    self.error.emit("Process completed but no result found")
-            
+            self._emit_results()
+    
+    def _emit_results(self):
+        if self.stop_requested:
+            self.stopped.emit()
             self._cleanup()
+            return
+        
+        # check for results
+        result_file = os.path.join(self.temp_dir, "result.pkl")
+        error_file = os.path.join(self.temp_dir, "error.txt")
+        
+        if os.path.exists(result_file):
+            try:
+                self.finished.emit(self._load_result(self.temp_dir))
+            except Exception as e:
+                self.error.emit(f"Failed to load result: {str(e)}")
+        elif os.path.exists(error_file):
+            try:
+                with open(error_file, 'r') as f:
+                    error_msg = f.read()
+                self.error.emit(error_msg)
+            except Exception as e:
+                self.error.emit(f"Process failed: {str(e)}")
+        else:
+            # check subprocess stderr (the daemon writes its stderr to the console)
+            stderr = ""
+            if self.process is not None and self.process.stderr:
+                stderr = self.process.stderr.read().decode()
+            if stderr:
+                self.error.emit(f"Process error: {stderr}")
+            else:
+                self.error.emit("Process completed but no result found")
+        
+        self._cleanup()
+    
+    @staticmethod
+    def _load_result(temp_dir):
+        # Read a result written by generation_worker.save_result. F is an (n, 3) view of the
+        # connectivity array that carries the matching offsets (see MeshFaces), so
+        # create_pyvista_mesh can give both to a vtkCellArray as they are.
+        # On POSIX the arrays are memory-mapped copy-on-write; the mappings stay valid after the
+        # temporary directory is removed. Windows cannot delete a mapped file, so there the
+        # arrays are read into memory and the directory can be removed right away.
+        mmap_mode = 'c' if os.name == 'posix' else None
+        with open(os.path.join(temp_dir, "result.pkl"), 'rb') as f:
+            result = pickle.load(f)
+        for fkey, vkey in result.pop("meshes"):
+            connectivity = np.load(os.path.join(temp_dir, fkey + "_connectivity.npy"), mmap_mode=mmap_mode)
+            faces = connectivity.reshape(-1, 3).view(MeshFaces)
+            faces.offsets = np.load(os.path.join(temp_dir, fkey + "_offsets.npy"), mmap_mode=mmap_mode)
+            result[fkey] = faces
+            result[vkey] = np.load(os.path.join(temp_dir, vkey + ".npy"), mmap_mode=mmap_mode)
+        return result
     
     def _cleanup(self):
         # Clean up temporary files and resources
         if self.temp_dir and os.path.exists(self.temp_dir):
+            import shutil
             try:
-                import shutil
                 shutil.rmtree(self.temp_dir)
-            except:
-                pass
+            except OSError as e:
+                print(f"Could not remove temporary directory {self.temp_dir}: {e}")
         self.temp_dir = None
         self.process = None
+        self.daemon = None
         
     def isRunning(self):
-        # check if the process is still running
+        # check if the job is still running
+        if self.daemon is not None:
+            return self.temp_dir is not None
         return self.process is not None and self.process.poll() is None
 
 
@@ -2189,6 +2446,16 @@ class SecondPage(QMainWindow):
         self.status_bar = self.statusBar()
         self.status_bar.setStyleSheet("background-color: #f0f0f0; color: #333; font-size: 16px;")
         
+        # live progress of the generation (stage, iteration, ETA) and per-stage timings when done
+        self.progress_label = QLabel("")
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setMaximumWidth(200)
+        self.progress_bar.setToolTip("Estimated from the last generation with the same type and MDP,\n"
+                                     "a different VF, repetitions or architecture are not taken into account")
+        self.progress_bar.setVisible(False)
+        self.status_bar.addPermanentWidget(self.progress_label)
+        self.status_bar.addPermanentWidget(self.progress_bar)
+        
         # split layout into left (configuration) and right (visualization)
         split_layout = QHBoxLayout()
         
@@ -2485,6 +2752,16 @@ class SecondPage(QMainWindow):
     # that is then used to display the mesh in the PyVista plotter of the second page
     def create_pyvista_mesh(self, F, V):
         
+        # results of the generation worker come in the offsets/connectivity layout of
+        # vtkCellArray (see MeshFaces), VTK shares these buffers and the points without a copy
+        offsets = getattr(F, "offsets", None)
+        if (offsets is not None and F.dtype == np.int64 and F.flags.c_contiguous
+                and isinstance(V, np.ndarray) and V.flags.c_contiguous):
+            mesh = pv.PolyData()
+            mesh.SetPoints(pv.vtk_points(V, deep=False))
+            mesh.SetPolys(pv.CellArray.from_arrays(offsets, F.reshape(-1), deep=False))
+            return mesh
+        
         vertices = np.array(V, dtype=np.float32)
         faces = np.array(F, dtype=np.int32)
         
@@ -2618,6 +2895,10 @@ class SecondPage(QMainWindow):
         global resolution_points
         resolution_points = text
     
+    def update_spinodal_seed(self, text):
+        global spinodal_seed
+        spinodal_seed = text
+    
     def update_cylindrical_hybrid_type(self, text):
         global cylindrical_hybrid_type
         cylindrical_hybrid_type = text
@@ -3249,6 +3530,14 @@ class SecondPage(QMainWindow):
         points_layout, self.points_input = self.create_input_field("Points:", "121", QRegExpValidator(QRegExp("[0-9]*")))
         self.points_input.textChanged.connect(lambda text: self.update_resolution(text))
         self.config_layout.addLayout(points_layout)
+        self.config_layout.addSpacing(10)
+        
+        # random seed of the spinodal waves, the same seed and inputs give the same structure
+        self.config_layout.addWidget(self.create_section_label("Random Seed"))
+        seed_layout, self.seed_input = self.create_input_field("Seed:", "", QRegExpValidator(QRegExp("[0-9]{0,9}")))
+        self.seed_input.setToolTip("Leave empty for new random waves on every run")
+        self.seed_input.textChanged.connect(lambda text: self.update_spinodal_seed(text))
+        self.config_layout.addLayout(seed_layout)
         
         # set initial state of advanced options (we don't have advanced options for spinodal)
         global advanced_options
@@ -4552,6 +4841,8 @@ class SecondPage(QMainWindow):
             print(params)
             self.exec_thread = GenerationProcess("TPMS", params)
             self.exec_thread.finished.connect(self.on_generation_finished)
+            self.exec_thread.progress.connect(self.on_generation_progress)
+            self.exec_thread.stopped.connect(self.on_generation_stopped)
             self.exec_thread.error.connect(self.on_generation_error)
             self.exec_thread.start()
             
@@ -4612,6 +4903,10 @@ class SecondPage(QMainWindow):
             params['MDP'] = int(resolution_points)
             params['W_Tnum'] = int(waves_number)
             
+            # seed of the random waves, handled by the generation worker
+            if spinodal_seed != "":
+                params['seed'] = int(spinodal_seed)
+            
             if model_ipc_structure == True:
                 params['IPC'] = "IPC_Y"
             else:
@@ -4656,6 +4951,8 @@ class SecondPage(QMainWindow):
             print(params)
             self.exec_thread = GenerationProcess("Spinodal", params)
             self.exec_thread.finished.connect(self.on_generation_finished)
+            self.exec_thread.progress.connect(self.on_generation_progress)
+            self.exec_thread.stopped.connect(self.on_generation_stopped)
             self.exec_thread.error.connect(self.on_generation_error)
             self.exec_thread.start()
             
@@ -4793,6 +5090,8 @@ class SecondPage(QMainWindow):
             print(params)
             self.exec_thread = GenerationProcess("Strut", params)
             self.exec_thread.finished.connect(self.on_generation_finished)
+            self.exec_thread.progress.connect(self.on_generation_progress)
+            self.exec_thread.stopped.connect(self.on_generation_stopped)
             self.exec_thread.error.connect(self.on_generation_error)
             self.exec_thread.start()
         
@@ -4903,6 +5202,8 @@ class SecondPage(QMainWindow):
             print(params)
             self.exec_thread = GenerationProcess("Hybrid", params)
             self.exec_thread.finished.connect(self.on_generation_finished)
+            self.exec_thread.progress.connect(self.on_generation_progress)
+            self.exec_thread.stopped.connect(self.on_generation_stopped)
             self.exec_thread.error.connect(self.on_generation_error)
             self.exec_thread.start()
             
@@ -4999,6 +5300,8 @@ class SecondPage(QMainWindow):
             print(params)
             self.exec_thread = GenerationProcess("Layered", params)
             self.exec_thread.finished.connect(self.on_generation_finished)
+            self.exec_thread.progress.connect(self.on_generation_progress)
+            self.exec_thread.stopped.connect(self.on_generation_stopped)
             self.exec_thread.error.connect(self.on_generation_error)
             self.exec_thread.start()
             
@@ -5020,6 +5323,11 @@ class SecondPage(QMainWindow):
         
         # handle Layered case separately because it has two meshes
         try:
+            # OCC is only needed for STEP export, import it here rather than at start-up
+            from OCC.Core.STEPControl import STEPControl_Writer, STEPControl_AsIs
+            from OCC.Core.StlAPI import StlAPI_Reader
+            from OCC.Core.TopoDS import TopoDS_Shape
+            
             if hasattr(self, 'F0') and hasattr(self, 'V0') and hasattr(self, 'F1') and hasattr(self, 'V1'):
                 if file_path.endswith(".stl"):
                     base_path = file_path[:-4] if file_path.endswith('.stl') else file_path
@@ -5167,6 +5475,46 @@ class SecondPage(QMainWindow):
             
             return
     
+    # function used by the gen thread to report the running stage, and the stage timings at the end
+    def on_generation_progress(self, info):
+        if info.get("event") != "progress":
+            self.progress_bar.setVisible(False)
+            timings = info.get("timings") or {}
+            # "<stage>: <step>" timings are part of their stage and only go to the tooltip
+            stages = [f"{stage} {seconds:.1f} s" for stage, seconds in timings.items() if stage != "total" and ": " not in stage and seconds >= 0.05]
+            steps = [f"{step} {seconds:.1f} s" for step, seconds in timings.items() if ": " in step]
+            if "total" in timings:
+                stages.append(f"total {timings['total']:.1f} s")
+            self.progress_label.setText(" | ".join(stages))
+            self.progress_label.setToolTip("\n".join(steps))
+            return
+        
+        text = info["stage"].capitalize()
+        if info.get("step") is not None:
+            text += f" ({info['step']})"
+        if info.get("iteration") is not None:
+            text += f", iter {info['iteration']}"
+        if info.get("vf") is not None:
+            text += f", VF = {info['vf']:.4f}"
+        text += f" - {info['elapsed']:.1f} s"
+        
+        if info.get("eta") is not None:
+            text += f", ~{info['eta']:.0f} s left"
+            total = info["elapsed"] + info["eta"]
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(int(100 * info["elapsed"] / total) if total > 0 else 100)
+        else:
+            # first run of this kind, no estimate yet
+            self.progress_bar.setRange(0, 0)
+        
+        self.progress_bar.setVisible(True)
+        self.progress_label.setText(text)
+    
+    # function used by the gen thread when a job is stopped without an answer from the worker
+    def on_generation_stopped(self):
+        self.progress_bar.setVisible(False)
+        self.progress_label.setText("")
+    
     # function used by the gen thread to update the self F,V .. to be used in the GUI
     def on_generation_finished(self, result):
         
@@ -5198,7 +5546,7 @@ class SecondPage(QMainWindow):
                     
                         # calculate the moments & enable the button, update surface and volume labels
                         try:
-                            self.moments = tpms_moments.get_moments(self.F, self.V)
+                            self.moments = get_moments(self.F, self.V)
                             print("moments=", self.moments)
                             self.moments_button.setEnabled(True)    # it changes stylesheet too, because on init we set 2
                                                                     # styles based on the stage (enabled/disabled)
@@ -5235,7 +5583,7 @@ class SecondPage(QMainWindow):
                         
                         # calculate the moments & enable the button, update surface and volume labels, update the mesh
                         try:
-                            self.moments = tpms_moments.get_moments(self.F, self.V)
+                            self.moments = get_moments(self.F, self.V)
                             print("moments=", self.moments)
                             self.moments_button.setEnabled(True)
                         except Exception as e:
@@ -5269,7 +5617,7 @@ class SecondPage(QMainWindow):
                     
                         # calculate the moments & enable the button, update surface and volume labels, update the mesh
                         try:
-                            self.moments = tpms_moments.get_moments(self.F, self.V)
+                            self.moments = get_moments(self.F, self.V)
                             print("moments=", self.moments)
                             self.moments_button.setEnabled(True)
                         except Exception as e:
@@ -5303,7 +5651,7 @@ class SecondPage(QMainWindow):
                         
                         # calculate the moments & enable the button, update surface and volume labels, update the mesh
                         try:
-                            self.moments = tpms_moments.get_moments(self.F, self.V)
+                            self.moments = get_moments(self.F, self.V)
                             print("moments=", self.moments)
                             self.moments_button.setEnabled(True)
                         except Exception as e:
@@ -5340,6 +5688,7 @@ class SecondPage(QMainWindow):
                 
     # function used by the gen thread to return an error if it occurs
     def on_generation_error(self, error):
+        self.progress_bar.setVisible(False)
         self.status_bar.showMessage(f"Generation failed: {error}")
         self.status_bar.setStyleSheet("background-color: #f8d7da; color: #721c24; font-size: 16px;")
         
@@ -5353,7 +5702,7 @@ class SecondPage(QMainWindow):
         
     def closeEvent(self, event):
         # check if process exists and is running
-        if hasattr(self, 'exec_thread') and self.exec_thread.process is not None and self.exec_thread.process.poll() is None:
+        if hasattr(self, 'exec_thread') and self.exec_thread.isRunning():
             reply = QMessageBox.question(
                 self,
                 "Confirm Exit",
@@ -5495,6 +5844,14 @@ def main():
     
     window = TPMSInterface()
     
+    # start the generation worker in the background so the first generation finds it warm,
+    # and let it release its process pool when the application exits
+    try:
+        WorkerDaemon.instance().ensure_started()
+    except OSError as e:
+        print(f"Could not start the generation worker: {e}")
+    app.aboutToQuit.connect(WorkerDaemon.instance().shutdown)
+    
     # make the window non-resizable - DISABLED for now
     #window.setFixedSize(1000, 750)
     
@@ -0,0 +1,184 @@
+# Regression tests for the persistent worker (generation_worker.py --serve), run against a
+# stub tpms_core whose generate_tpms waits on the process pool like the graded and hybrid
+# generators do.
+import json
+import os
+import pickle
+import queue
+import signal
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+
+WORKER = os.path.join(os.path.dirname(__file__), os.pardir, "gui", "generation_worker.py")
+
+STUB_TPMS_CORE = textwrap.dedent('''
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+
+    _process_pool = None
+
+    def get_process_pool():
+        global _process_pool
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=2)
+        return _process_pool
+
+    def cleanup_process_pool():
+        global _process_pool
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=True)
+            _process_pool = None
+
+    def _layer(seconds, line=None):
+        if line:
+            print(line, flush=True)
+        time.sleep(seconds)
+        return seconds
+
+    def generate_tpms(stop_callback=None, **params):
+        for line in params.get("lines", []):
+            print(line)
+        future = get_process_pool().submit(_layer, params["seconds"], params.get("child_line"))
+        if params.get("native"):
+            # a long native call: signals are only handled once it returns
+            sum(range(10 ** 11))
+        future.result()
+        cleanup_process_pool()
+        return [[0, 1, 2]], [[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]], 30.0, 1.0
+''')
+
+
+@pytest.fixture
+def worker(tmp_path):
+    (tmp_path / "python").mkdir()
+    (tmp_path / "python" / "tpms_core.py").write_text(STUB_TPMS_CORE)
+    (tmp_path / "gui").mkdir()
+    # started like WorkerDaemon starts it, in its own session
+    process = subprocess.Popen([sys.executable, os.path.abspath(WORKER), "--serve"],
+                               cwd=str(tmp_path / "gui"), stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, universal_newlines=True, bufsize=1,
+                               start_new_session=(os.name == "posix"))
+    messages = queue.Queue()
+
+    def read():
+        for line in process.stdout:
+            messages.put(json.loads(line))
+        messages.put({"event": "exit"})
+
+    threading.Thread(target=read, daemon=True).start()
+    assert messages.get(timeout=30)["event"] == "ready"
+    yield process, messages, tmp_path
+    process.kill()
+    process.wait()
+    if os.name == "posix":
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+
+def submit(process, tmp_path, name, seconds, lines=(), native=False, child_line=None):
+    temp_dir = tmp_path / name
+    temp_dir.mkdir()
+    params_file = temp_dir / "params.pkl"
+    with open(params_file, "wb") as f:
+        pickle.dump(("TPMS", {"seconds": seconds, "lines": list(lines), "native": native,
+                     "child_line": child_line}), f)
+    process.stdin.write(json.dumps({"params_file": str(params_file), "temp_dir": str(temp_dir)}) + "\n")
+    process.stdin.flush()
+    return str(temp_dir)
+
+
+def wait_for_answer(messages, temp_dir, timeout, progress=None):
+    deadline = time.monotonic() + timeout
+    while True:
+        message = messages.get(timeout=max(deadline - time.monotonic(), 0.001))
+        if message.get("temp_dir") != temp_dir:
+            continue
+        if message.get("event") in ("done", "cancelled"):
+            return message
+        if progress is not None:
+            progress.append(message)
+
+
+def test_pool_job_completes(worker):
+    process, messages, tmp_path = worker
+    for name in ("first", "second"):
+        temp_dir = submit(process, tmp_path, name, 0.1)
+        message = wait_for_answer(messages, temp_dir, timeout=30)
+        assert message["event"] == "done" and message["ok"]
+        assert os.path.exists(os.path.join(temp_dir, "result.pkl"))
+
+
+@pytest.mark.skipif(not hasattr(signal, "pthread_kill"), reason="needs signal.pthread_kill")
+def test_cancel_interrupts_pool_wait(worker):
+    process, messages, tmp_path = worker
+    temp_dir = submit(process, tmp_path, "long", 60)
+    time.sleep(1.0)
+    start = time.monotonic()
+    process.stdin.write(json.dumps({"command": "cancel"}) + "\n")
+    process.stdin.flush()
+    message = wait_for_answer(messages, temp_dir, timeout=10)
+    assert message["event"] == "cancelled"
+    assert time.monotonic() - start < 2.0
+
+    # the worker stays usable after the cancel
+    temp_dir = submit(process, tmp_path, "after", 0.1)
+    assert wait_for_answer(messages, temp_dir, timeout=30)["event"] == "done"
+
+
+
+@pytest.mark.skipif(os.name != "posix", reason="process groups are POSIX only")
+def test_stopped_worker_takes_its_pool_along(worker):
+    # a cancel cannot interrupt a long native call, so WorkerDaemon terminates the session of
+    # the worker: the pool children go with it, and as they held the worker's stdout too, the
+    # GUI only sees its end once they are gone
+    process, messages, tmp_path = worker
+    submit(process, tmp_path, "native", 60, native=True)
+    time.sleep(1.0)
+    os.killpg(process.pid, signal.SIGTERM)
+    deadline = time.monotonic() + 10
+    while messages.get(timeout=max(deadline - time.monotonic(), 0.001))["event"] != "exit":
+        pass
+    assert process.wait(timeout=10) != 0
+
+
+def test_calibration_keeps_its_stage(worker):
+    # each calibration iteration meshes and measures the part: those lines are steps of
+    # the calibration, not stages of their own
+    process, messages, tmp_path = worker
+    lines = ["Creating Architecture", "Before RDensity: tStart=0.5 Vol_frac=0.3"]
+    for i in range(2):
+        lines += [f"RDensity: iter {i}, tStart = 0.5, Vol_frac = 0.3", "inside get_fv", "calling isosurface",
+                  "calling isocaps", "stlVolumeFraction: Vol_frac=0.3000"]
+    lines += ["After RDensity: tStart=0.5 Vol_frac=0.3", "inside get_fv", "calling isocaps"]
+    progress = []
+    temp_dir = submit(process, tmp_path, "calibrated", 0.1, lines)
+    message = wait_for_answer(messages, temp_dir, timeout=30, progress=progress)
+    assert message["ok"]
+
+    stages = [(event["stage"], event["step"]) for event in progress]
+    assert ("calibration", "isosurface") in stages and ("calibration", "measurement") in stages
+    assert stages[-1] == ("isocaps", None)
+    calibration = [event for event in progress if event["stage"] == "calibration"]
+    assert [event["iteration"] for event in calibration if event["iteration"] is not None] == [0, 1]
+
+    timings = message["timings"]
+    assert "calibration: isosurface" in timings and "measurement" not in timings
+    assert timings["calibration: isocaps"] <= timings["calibration"]
+
+
+def test_pool_children_do_not_report(worker):
+    # the pool children inherit the worker's stdout: what they print is not progress
+    process, messages, tmp_path = worker
+    progress = []
+    temp_dir = submit(process, tmp_path, "child", 0.5, ["Creating Architecture"], child_line="calling isocaps")
+    assert wait_for_answer(messages, temp_dir, timeout=30, progress=progress)["ok"]
+    assert [event["stage"] for event in progress] == ["field"]